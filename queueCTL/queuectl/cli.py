@@ -4,6 +4,7 @@ from .job import enqueue, list_jobs, status
 from .worker import worker as worker_cmd
 from .dlq import dlq as dlq_cmd
 from .config import config as config_cmd
+from .server import serve as serve_cmd
 
 @click.group()
 def cli():
@@ -18,6 +19,7 @@ cli.add_command(status)
 cli.add_command(worker_cmd)
 cli.add_command(dlq_cmd)
 cli.add_command(config_cmd)
+cli.add_command(serve_cmd)
 
 if __name__ == "__main__":
     cli()
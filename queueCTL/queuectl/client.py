@@ -0,0 +1,124 @@
+import http.client
+import json
+import socket
+from urllib.parse import urlencode, urlparse
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class QueueClientError(Exception):
+    """Raised when the queuectl server answers with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class QueueClient:
+    """Client for a running `queuectl serve`.
+
+    Keeps one keep-alive connection open, so it is cheap to call in a loop.
+    Not thread-safe: use one client per thread.
+
+    Example:
+        client = QueueClient()  # or QueueClient(socket_path="/tmp/queuectl.sock", token=...)
+        client.enqueue("echo hi", id="job1")
+        client.enqueue_batch([{"command": "sleep 1"}, {"command": "sleep 2"}])
+    """
+
+    def __init__(self, url=DEFAULT_URL, socket_path=None, timeout=30, token=None):
+        self.token = token
+        if socket_path:
+            self._conn = _UnixHTTPConnection(socket_path, timeout)
+        else:
+            parsed = urlparse(url)
+            self._conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=timeout)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _request(self, method, path, body=None, query=None):
+        if query:
+            query = {k: v for k, v in query.items() if v is not None}
+            if query:
+                path += "?" + urlencode(query)
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self._conn.request(method, path, body=data, headers=headers)
+            resp = self._conn.getresponse()
+            payload = json.loads(resp.read() or b"{}")
+        except (OSError, http.client.HTTPException):
+            # Drop the broken connection; the next call reconnects
+            self._conn.close()
+            raise
+        if resp.status >= 400:
+            raise QueueClientError(resp.status, payload.get("error", resp.reason))
+        return payload
+
+    def enqueue(self, command, **fields):
+        """Enqueue one job and return its id. Extra fields (id, max_retries,
+        retry overrides) are passed through as in `queuectl enqueue`."""
+        return self._request("POST", "/jobs", dict(fields, command=command))["enqueued"][0]
+
+    def enqueue_batch(self, jobs):
+        """Enqueue a list of job dicts in one request and return their ids."""
+        return self._request("POST", "/jobs", list(jobs))["enqueued"]
+
+    def status(self):
+        return self._request("GET", "/status")
+
+    def list_jobs(self, state=None, limit=100):
+        return self._request("GET", "/jobs", query={"state": state, "limit": limit})["jobs"]
+
+    def dlq_list(self, since=None, error_match=None, command_match=None, limit=100,
+                 after_updated_at=None, after_id=None):
+        """One page of DLQ jobs. Pass the last job's updated_at and id as
+        after_updated_at / after_id to get the next page."""
+        query = {"since": since, "error_match": error_match, "command_match": command_match,
+                 "limit": limit, "after_updated_at": after_updated_at, "after_id": after_id}
+        return self._request("GET", "/dlq", query=query)["jobs"]
+
+    def iter_dlq(self, since=None, error_match=None, command_match=None, page_size=500):
+        """Yield every matching DLQ job, fetching page_size jobs per request."""
+        after = {}
+        while True:
+            jobs = self.dlq_list(since, error_match, command_match, limit=page_size, **after)
+            yield from jobs
+            if len(jobs) < page_size:
+                return
+            after = {"after_updated_at": jobs[-1]["updated_at"], "after_id": jobs[-1]["id"]}
+
+    def dlq_retry(self, job_id=None, all=False, since=None, error_match=None, command_match=None, rate=None):
+        """Requeue one DLQ job by id, or every job matching all / the filters.
+        Returns the number of jobs requeued."""
+        body = {"id": job_id, "all": all, "since": since, "error_match": error_match,
+                "command_match": command_match, "rate": rate}
+        return self._request("POST", "/dlq/retry", body)["requeued"]
+
+    def dlq_purge(self, all=False, since=None, error_match=None, command_match=None):
+        """Delete DLQ jobs matching all / the filters. Returns the number deleted."""
+        body = {"all": all, "since": since, "error_match": error_match, "command_match": command_match}
+        return self._request("POST", "/dlq/purge", body)["purged"]
@@ -1,5 +1,6 @@
 import click
 from .db import get_conn, set_config, get_config
+from .retry import JITTER_MODES, parse_exit_codes
 
 @click.group()
 def config():
@@ -16,10 +17,14 @@ def config_set(key, value):
     Examples:
       queuectl config set max_retries 5
       queuectl config set backoff_base 3
+      queuectl config set backoff_jitter full
+      queuectl config set retry_on_exit_codes 1,75
+
+    Running workers pick up retry settings without a restart.
     """
     conn = get_conn()
     # Basic validation for known keys
-    if key in ("max_retries", "backoff_base"):
+    if key in ("max_retries", "backoff_base", "backoff_max", "circuit_threshold", "circuit_cooldown"):
         try:
             intval = int(value)
             if intval < 0:
@@ -27,6 +32,15 @@ def config_set(key, value):
         except Exception as e:
             click.echo(f"Invalid value for {key}: {e}")
             raise SystemExit(1)
+    elif key == "backoff_jitter" and value not in JITTER_MODES:
+        click.echo(f"Invalid value for {key}: must be one of {', '.join(JITTER_MODES)}")
+        raise SystemExit(1)
+    elif key == "retry_on_exit_codes":
+        try:
+            parse_exit_codes(value)
+        except ValueError as e:
+            click.echo(f"Invalid value for {key}: {e}")
+            raise SystemExit(1)
     set_config(conn, key, value)
     click.echo(f"Set {key}={value}")
 
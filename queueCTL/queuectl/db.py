@@ -8,7 +8,8 @@ DB_PATH = os.getenv("QUEUECTL_DB", "queuectl.db")
 
 def get_conn():
     # isolation_level=None => autocommit mode disabled; we'll use explicit transactions
-    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+    # Resolve the path per call so QUEUECTL_DB can be changed after import
+    conn = sqlite3.connect(os.getenv("QUEUECTL_DB", DB_PATH), timeout=30, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -28,19 +29,41 @@ def init_db():
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
     last_error TEXT,
-    next_run_at TEXT
+    next_run_at TEXT,
+    retry_policy TEXT,
+    last_delay REAL
     )
     """)
+    # Databases created before per-job retry policies lack these columns
+    cols = [r[1] for r in cur.execute("PRAGMA table_info(jobs)").fetchall()]
+    if "retry_policy" not in cols:
+        cur.execute("ALTER TABLE jobs ADD COLUMN retry_policy TEXT")
+    if "last_delay" not in cols:
+        cur.execute("ALTER TABLE jobs ADD COLUMN last_delay REAL")
+    # Bulk DLQ operations scan dead jobs in updated_at order
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_updated ON jobs(state, updated_at)")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS config (
     key TEXT PRIMARY KEY,
     value TEXT NOT NULL
     )
     """)
-    # defaults
-    set_config(conn, "max_retries", "3")
-    set_config(conn, "backoff_base", "2")
-    set_config(conn, "stop_workers", "false")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS circuits (
+    command_class TEXT PRIMARY KEY,
+    failures INTEGER NOT NULL DEFAULT 0,
+    opened_until TEXT
+    )
+    """)
+    # defaults (never overwrite values set with `queuectl config set`)
+    set_default_config(conn, "max_retries", "3")
+    set_default_config(conn, "backoff_base", "2")
+    set_default_config(conn, "backoff_max", "300")
+    set_default_config(conn, "backoff_jitter", "none")
+    set_default_config(conn, "retry_on_exit_codes", "")
+    set_default_config(conn, "circuit_threshold", "0")
+    set_default_config(conn, "circuit_cooldown", "60")
+    set_default_config(conn, "stop_workers", "false")
     conn.commit()
     conn.close()
 
@@ -54,6 +77,12 @@ def set_config(conn, key, value):
     conn.commit()
 
 
+def set_default_config(conn, key, value):
+    cur = conn.cursor()
+    cur.execute("INSERT OR IGNORE INTO config(key,value) VALUES(?,?)", (key, str(value)))
+    conn.commit()
+
+
 def get_config(conn, key, default=None):
     cur = conn.cursor()
     cur.execute("SELECT value FROM config WHERE key=?", (key,))
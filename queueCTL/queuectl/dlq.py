@@ -1,8 +1,141 @@
 import click
+import datetime
 from .db import get_conn
-from .utils import now_iso
+from .utils import now_iso, future_iso
 import json
 
+DEFAULT_BATCH_SIZE = 500
+
+
+def dead_filter(since=None, error_match=None, command_match=None):
+    """Build the WHERE clause selecting dead jobs that match the given filters.
+    Returns (sql, params). All filters are optional and combined with AND."""
+    clauses = ["state='dead'"]
+    params = []
+    if since:
+        clauses.append("updated_at >= ?")
+        params.append(since)
+    if error_match:
+        clauses.append("instr(last_error, ?) > 0")
+        params.append(error_match)
+    if command_match:
+        clauses.append("instr(command, ?) > 0")
+        params.append(command_match)
+    return " AND ".join(clauses), params
+
+
+def requeue_job(conn, job_id):
+    """Move a single dead job back to pending. Returns False if it is not in the DLQ."""
+    now = now_iso()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE jobs SET state='pending', attempts=0, updated_at=?, last_error=NULL, next_run_at=? WHERE id=? AND state='dead'",
+        (now, now, job_id),
+    )
+    conn.commit()
+    return cur.rowcount > 0
+
+
+def requeue_dead(conn, since=None, error_match=None, command_match=None,
+                 rate=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Move matching dead jobs back to pending in chunked UPDATEs.
+    If rate is given (jobs per second), next_run_at is staggered so that
+    at most `rate` requeued jobs become runnable per second: the n-th
+    requeued job runs n // rate seconds from now.
+    Returns the number of jobs requeued."""
+    where, params = dead_filter(since, error_match, command_match)
+    cur = conn.cursor()
+    start = datetime.datetime.utcnow().replace(microsecond=0)
+    now = future_iso(0, start)
+    total = 0
+    while True:
+        if rate:
+            # Per-row offset from the row's position among all requeued jobs
+            run_at_sql = "strftime('%Y-%m-%dT%H:%M:%SZ', ?, '+' || ((? + picked.rn) / ?) || ' seconds')"
+            run_at_params = (start.isoformat(), total, rate)
+        else:
+            run_at_sql = "?"
+            run_at_params = (now,)
+        cur.execute(
+            f"""UPDATE jobs SET state='pending', attempts=0, updated_at=?, last_error=NULL, next_run_at={run_at_sql}
+            FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, id) - 1 AS rn
+                  FROM (SELECT id, updated_at FROM jobs WHERE {where} ORDER BY updated_at, id LIMIT ?)) AS picked
+            WHERE jobs.id = picked.id""",
+            (now, *run_at_params, *params, batch_size),
+        )
+        conn.commit()
+        total += cur.rowcount
+        if cur.rowcount < batch_size:
+            return total
+
+
+def purge_dead(conn, since=None, error_match=None, command_match=None,
+               batch_size=DEFAULT_BATCH_SIZE):
+    """Delete matching dead jobs in chunked DELETEs. Returns the number deleted."""
+    where, params = dead_filter(since, error_match, command_match)
+    cur = conn.cursor()
+    total = 0
+    while True:
+        cur.execute(
+            f"DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE {where} ORDER BY updated_at LIMIT ?)",
+            (*params, batch_size),
+        )
+        conn.commit()
+        total += cur.rowcount
+        if cur.rowcount < batch_size:
+            return total
+
+
+def iter_dead(conn, since=None, error_match=None, command_match=None,
+              batch_size=DEFAULT_BATCH_SIZE, after=("", "")):
+    """Yield matching dead jobs as dicts, paging through the (state, updated_at) index.
+    after=(updated_at, id) resumes after that job."""
+    where, params = dead_filter(since, error_match, command_match)
+    cur = conn.cursor()
+    last = tuple(after)
+    while True:
+        rows = cur.execute(
+            f"""SELECT * FROM jobs WHERE {where} AND (updated_at, id) > (?, ?)
+            ORDER BY updated_at, id LIMIT ?""",
+            (*params, *last, batch_size),
+        ).fetchall()
+        for r in rows:
+            yield dict(r)
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1]["updated_at"], rows[-1]["id"])
+
+
+def normalize_since(value):
+    """Normalize an ISO-8601 timestamp to the stored UTC format. Raises ValueError."""
+    if value is None:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(value[:-1] if value.endswith("Z") else value)
+    except ValueError:
+        raise ValueError("expected an ISO-8601 timestamp, e.g. 2025-11-04T10:30:00Z")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt.replace(microsecond=0).isoformat() + "Z"
+
+
+def _parse_since(ctx, param, value):
+    try:
+        return normalize_since(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def filter_options(f):
+    """Attach the shared dead-job selection options to a DLQ command."""
+    f = click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True,
+                     type=click.IntRange(min=1), help="Rows touched per transaction")(f)
+    f = click.option("--command-match", help="Only jobs whose command contains this text")(f)
+    f = click.option("--error-match", help="Only jobs whose last_error contains this text")(f)
+    f = click.option("--since", callback=_parse_since,
+                     help="Only jobs that died at or after this ISO-8601 timestamp")(f)
+    return f
+
 
 @click.group()
 def dlq():
@@ -26,21 +159,64 @@ def dlq_list():
 
 
 @dlq.command("retry")
-@click.argument("job_id")
-def dlq_retry(job_id):
-    """Retry a job from the Dead Letter Queue"""
+@click.argument("job_id", required=False)
+@click.option("--all", "all_jobs", is_flag=True, help="Requeue every job in the DLQ")
+@filter_options
+@click.option("--rate", type=click.IntRange(min=1),
+              help="Spread requeued jobs out to at most this many per second")
+def dlq_retry(job_id, all_jobs, since, error_match, command_match, batch_size, rate):
+    """Retry a job from the Dead Letter Queue, or many with --all / filters
+
+    \b
+    Examples:
+      queuectl dlq retry job1
+      queuectl dlq retry --all --rate 100
+      queuectl dlq retry --since 2025-11-04T10:00:00Z --error-match timeout
+    """
+    filtered = bool(since or error_match or command_match)
+    if job_id and (all_jobs or filtered or rate):
+        click.echo("Pass either a job id or --all / filters, not both")
+        raise SystemExit(1)
+    if not job_id:
+        if not (all_jobs or filtered):
+            click.echo("Specify a job id, --all, or at least one filter")
+            raise SystemExit(1)
+        conn = get_conn()
+        count = requeue_dead(conn, since, error_match, command_match, rate=rate, batch_size=batch_size)
+        conn.close()
+        click.echo(f"Requeued {count} job(s) from DLQ")
+        return
     conn = get_conn()
-    cur = conn.cursor()
-    row = cur.execute("SELECT * FROM jobs WHERE id=? AND state='dead'", (job_id,)).fetchone()
-    if not row:
+    if not requeue_job(conn, job_id):
         click.echo("Job not found in DLQ")
         conn.close()
         raise SystemExit(1)
-    now = now_iso()
-    cur.execute(
-        "UPDATE jobs SET state='pending', attempts=0, updated_at=?, last_error=NULL, next_run_at=? WHERE id=?",
-        (now, now, job_id),
-    )
-    conn.commit()
     conn.close()
     click.echo(f"Requeued {job_id} from DLQ")
+
+
+@dlq.command("purge")
+@click.option("--all", "all_jobs", is_flag=True, help="Delete every job in the DLQ")
+@filter_options
+@click.confirmation_option(prompt="Permanently delete the matching DLQ jobs?")
+def dlq_purge(all_jobs, since, error_match, command_match, batch_size):
+    """Delete jobs from the Dead Letter Queue"""
+    if not (all_jobs or since or error_match or command_match):
+        click.echo("Specify --all or at least one filter")
+        raise SystemExit(1)
+    conn = get_conn()
+    count = purge_dead(conn, since, error_match, command_match, batch_size=batch_size)
+    conn.close()
+    click.echo(f"Purged {count} job(s) from DLQ")
+
+
+@dlq.command("export")
+@click.option("--output", "-o", type=click.File("w"), default="-",
+              help="File to write JSON lines to (default: stdout)")
+@filter_options
+def dlq_export(output, since, error_match, command_match, batch_size):
+    """Export Dead Letter Queue jobs as JSON lines"""
+    conn = get_conn()
+    for job in iter_dead(conn, since, error_match, command_match, batch_size=batch_size):
+        output.write(json.dumps(job, default=str) + "\n")
+    conn.close()
@@ -3,37 +3,83 @@ import uuid
 import click
 from .db import get_conn, get_config
 from .utils import now_iso
+from .retry import POLICY_KEYS, validate_policy
+
+JOB_STATES = ["pending", "processing", "completed", "failed", "dead"]
+
+INSERT_JOB_SQL = (
+    "INSERT OR REPLACE INTO jobs(id,command,state,attempts,max_retries,created_at,updated_at,next_run_at,retry_policy) "
+    "VALUES (?,?,?,?,?,?,?,?,?)"
+)
+
+
+def prepare_job(job, default_max_retries=None):
+    """Validate a job dict from enqueue JSON and return the row for INSERT_JOB_SQL.
+    If the job has no max_retries and no default is given, the row's
+    max_retries is None and must be filled in before inserting.
+    Raises ValueError with a user-facing message."""
+    if not isinstance(job, dict):
+        raise ValueError("Job must be a JSON object")
+    job_id = job.get("id")
+    if job_id is not None and not isinstance(job_id, str):
+        raise ValueError("Job 'id' must be a string")
+    job_id = job_id or str(uuid.uuid4())
+    command = job.get("command")
+    if not command:
+        raise ValueError("Job must contain 'command'")
+    if not isinstance(command, str):
+        raise ValueError("Job 'command' must be a string")
+    try:
+        max_retries = job.get("max_retries") or default_max_retries
+        if max_retries is not None:
+            max_retries = int(max_retries)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid max_retries: " + str(e))
+    try:
+        retry_policy = validate_policy({k: job[k] for k in POLICY_KEYS if k in job})
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid retry policy: " + str(e))
+    now = now_iso()
+    return (job_id, command, "pending", 0, max_retries, now, now, now,
+            json.dumps(retry_policy) if retry_policy else None)
+
+
+def state_counts(conn):
+    """Return {state: count} for every known job state."""
+    cur = conn.cursor()
+    cur.execute("SELECT state, COUNT(*) as count FROM jobs GROUP BY state")
+    counts = {row[0]: row[1] for row in cur.fetchall()}
+    return {state: counts.get(state, 0) for state in JOB_STATES}
 
 
 @click.command()
 @click.argument("job_json", type=str)
 def enqueue(job_json):
-    """Enqueue a job: queuectl enqueue '{"id":"job1","command":"sleep 2"}'"""
+    """Enqueue a job: queuectl enqueue '{"id":"job1","command":"sleep 2"}'
+
+    Optional retry overrides: backoff_base, backoff_max, jitter, retry_on.
+    """
     try:
         job = json.loads(job_json)
     except Exception as e:
         click.echo("Invalid JSON: " + str(e))
         raise SystemExit(1)
-    job_id = job.get("id") or str(uuid.uuid4())
-    command = job.get("command")
-    if not command:
-        click.echo("Job must contain 'command'")
-        raise SystemExit(1)
     conn = get_conn()
-    max_retries = int(job.get("max_retries") or int(get_config(conn, "max_retries", "3")))
-    now = now_iso()
+    try:
+        row = prepare_job(job, int(get_config(conn, "max_retries", "3")))
+    except ValueError as e:
+        click.echo(str(e))
+        conn.close()
+        raise SystemExit(1)
     cur = conn.cursor()
-    cur.execute(
-        "INSERT OR REPLACE INTO jobs(id,command,state,attempts,max_retries,created_at,updated_at,next_run_at) VALUES (?,?,?,?,?,?,?,?)",
-        (job_id, command, "pending", 0, max_retries, now, now, now),
-    )
+    cur.execute(INSERT_JOB_SQL, row)
     conn.commit()
     conn.close()
-    click.echo(f"Enqueued job {job_id}")
+    click.echo(f"Enqueued job {row[0]}")
 
 
 @click.command("list")
-@click.option("--state", type=click.Choice(["pending", "processing", "completed", "failed", "dead"], case_sensitive=False), help="Filter jobs by state")
+@click.option("--state", type=click.Choice(JOB_STATES, case_sensitive=False), help="Filter jobs by state")
 def list_jobs(state):
     """List jobs, optionally filtered by state"""
     conn = get_conn()
@@ -59,8 +105,7 @@ def status():
     cur = conn.cursor()
     
     # Count jobs by state
-    cur.execute("SELECT state, COUNT(*) as count FROM jobs GROUP BY state")
-    state_counts = {row[0]: row[1] for row in cur.fetchall()}
+    counts = state_counts(conn)
     
     # Get total jobs
     cur.execute("SELECT COUNT(*) FROM jobs")
@@ -73,8 +118,7 @@ def status():
     click.echo("=== QueueCTL Status ===")
     click.echo(f"Total Jobs: {total_jobs}")
     click.echo(f"\nJobs by State:")
-    for state in ["pending", "processing", "completed", "failed", "dead"]:
-        count = state_counts.get(state, 0)
+    for state, count in counts.items():
         click.echo(f"  {state.capitalize()}: {count}")
     
     click.echo(f"\nWorkers Active: {workers_active}")
@@ -83,5 +127,7 @@ def status():
     backoff_base = get_config(conn, "backoff_base", "2")
     click.echo(f"  Max Retries: {max_retries}")
     click.echo(f"  Backoff Base: {backoff_base}")
+    click.echo(f"  Backoff Max: {get_config(conn, 'backoff_max', '300')}")
+    click.echo(f"  Backoff Jitter: {get_config(conn, 'backoff_jitter', 'none')}")
     
     conn.close()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import datetime
+import json
+import random
+from .db import get_config
+from .utils import now_iso, future_iso
+
+JITTER_MODES = ("none", "full", "decorrelated")
+
+# Hard ceiling on any retry delay, also when backoff_max=0 disables the cap
+MAX_DELAY_SECONDS = 7 * 24 * 3600
+
+# Keys a job may override in its enqueue JSON
+POLICY_KEYS = ("backoff_base", "backoff_max", "jitter", "retry_on")
+
+
+def parse_exit_codes(value):
+    """Parse a comma separated list of exit codes ("1,75") into a list of ints."""
+    if isinstance(value, (list, tuple)):
+        return [int(v) for v in value]
+    return [int(v) for v in str(value).split(",") if v.strip()]
+
+
+def validate_policy(overrides):
+    """Validate and normalize per-job retry overrides. Raises ValueError."""
+    policy = {}
+    for key in ("backoff_base", "backoff_max"):
+        if key in overrides:
+            v = int(overrides[key])
+            if v < 0:
+                raise ValueError(f"{key} must be >= 0")
+            policy[key] = v
+    if "jitter" in overrides:
+        if overrides["jitter"] not in JITTER_MODES:
+            raise ValueError(f"jitter must be one of {', '.join(JITTER_MODES)}")
+        policy["jitter"] = overrides["jitter"]
+    if "retry_on" in overrides:
+        policy["retry_on"] = parse_exit_codes(overrides["retry_on"])
+    return policy
+
+
+def load_policy(conn, overrides=None):
+    """Build the effective retry policy from the config table plus any
+    per-job overrides (the JSON stored in jobs.retry_policy).
+    Config is read on every call so changes apply without restarting workers."""
+    policy = {
+        "backoff_base": int(get_config(conn, "backoff_base", "2")),
+        "backoff_max": int(get_config(conn, "backoff_max", "300")),
+        "jitter": get_config(conn, "backoff_jitter", "none"),
+        "retry_on": parse_exit_codes(get_config(conn, "retry_on_exit_codes", "")),
+    }
+    if overrides:
+        policy.update(json.loads(overrides))
+    return policy
+
+
+def compute_delay(policy, attempts, rng=random, prev_delay=None):
+    """Seconds to wait before the next attempt.
+
+    none:         base ** attempts
+    full:         uniform(0, base ** attempts)
+    decorrelated: uniform(base, 3 * prev_delay), where prev_delay is the
+                  previous sleep (jobs.last_delay) and starts at base
+    A base of 0 means no delay in every mode. The result is capped at
+    backoff_max (0 disables the cap) and never exceeds MAX_DELAY_SECONDS."""
+    base = policy["backoff_base"]
+    cap = min(policy["backoff_max"] or MAX_DELAY_SECONDS, MAX_DELAY_SECONDS)
+    jitter = policy["jitter"]
+    if base == 0:
+        return 0
+    if jitter == "decorrelated":
+        if attempts == 0 or not prev_delay:
+            prev_delay = base
+        delay = rng.uniform(base, max(base, 3 * prev_delay))
+    else:
+        delay = min(cap, base ** attempts)
+        if jitter == "full":
+            delay = rng.uniform(0, delay)
+    return min(cap, delay)
+
+
+def should_retry(policy, attempts, max_retries, exit_code=None):
+    """Whether a failed job gets another attempt. When retry_on lists exit
+    codes, any other exit code is treated as permanent. Timeouts and errors
+    without an exit code are always retryable."""
+    if attempts >= max_retries:
+        return False
+    if exit_code is None or not policy["retry_on"]:
+        return True
+    return exit_code in policy["retry_on"]
+
+
+def command_class(command):
+    """Group jobs for circuit breaking by the program they run."""
+    parts = command.split()
+    return parts[0] if parts else ""
+
+
+def circuit_open_until(conn, command):
+    """Return the time the circuit for this command's class reopens, or None if closed."""
+    if int(get_config(conn, "circuit_threshold", "0")) <= 0:
+        return None
+    row = conn.execute(
+        "SELECT opened_until FROM circuits WHERE command_class=?", (command_class(command),)
+    ).fetchone()
+    if row and row[0] and row[0] > now_iso():
+        return row[0]
+    return None
+
+
+def defer_until(conn, open_until, rng=random):
+    """When to retry a job deferred by an open circuit: a random point within
+    one cooldown after the circuit closes, so deferred jobs do not all become
+    runnable at the same instant."""
+    cooldown = int(get_config(conn, "circuit_cooldown", "60"))
+    closes_at = datetime.datetime.fromisoformat(open_until.rstrip("Z"))
+    return future_iso(rng.uniform(0, cooldown), closes_at)
+
+
+def record_outcome(conn, command, success):
+    """Track consecutive failures per command class. After circuit_threshold
+    failures in a row the circuit opens for circuit_cooldown seconds; the first
+    failure after the cooldown reopens it, a success closes it."""
+    threshold = int(get_config(conn, "circuit_threshold", "0"))
+    if threshold <= 0:
+        return
+    cls = command_class(command)
+    cur = conn.cursor()
+    if success:
+        cur.execute("UPDATE circuits SET failures=0, opened_until=NULL WHERE command_class=?", (cls,))
+    else:
+        cur.execute(
+            "INSERT INTO circuits(command_class, failures) VALUES (?, 1) "
+            "ON CONFLICT(command_class) DO UPDATE SET failures=failures+1",
+            (cls,),
+        )
+        failures = cur.execute("SELECT failures FROM circuits WHERE command_class=?", (cls,)).fetchone()[0]
+        if failures >= threshold:
+            cooldown = int(get_config(conn, "circuit_cooldown", "60"))
+            cur.execute(
+                "UPDATE circuits SET opened_until=? WHERE command_class=?", (future_iso(cooldown), cls)
+            )
+    conn.commit()
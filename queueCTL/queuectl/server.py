@@ -0,0 +1,440 @@
+import hmac
+import ipaddress
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import sqlite3
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import click
+from .db import get_conn, get_config
+from .job import INSERT_JOB_SQL, JOB_STATES, prepare_job, state_counts
+from .dlq import DEFAULT_BATCH_SIZE, iter_dead, normalize_since, purge_dead, requeue_dead, requeue_job
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_LIMIT = 1000
+
+
+class _PendingEnqueue:
+    """Rows from one client request waiting for the group commit."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.error = None
+        self.done = threading.Event()
+
+
+class EnqueueBatcher:
+    """Single writer that group-commits enqueues from concurrent requests.
+
+    Everything queued while the previous commit was running (up to max_batch
+    rows) is written in one transaction, so the per-commit cost is paid once
+    per batch instead of once per job. max_wait optionally holds a batch open
+    a little longer to gather more rows."""
+
+    def __init__(self, max_batch=1000, max_wait=0):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def submit(self, rows):
+        """Queue rows for insertion and block until they are committed."""
+        pending = _PendingEnqueue(rows)
+        self.requests.put(pending)
+        pending.done.wait()
+        if pending.error:
+            raise pending.error
+
+    def _collect(self, first):
+        batch = [first]
+        count = len(first.rows)
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self.requests.get(timeout=remaining)
+                else:
+                    item = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            count += len(item.rows)
+        return batch
+
+    def _write(self, conn, batch):
+        # Jobs without max_retries get the configured default, read once per batch
+        default_max_retries = int(get_config(conn, "max_retries", "3"))
+
+        def with_defaults(rows):
+            return [row if row[4] is not None else row[:4] + (default_max_retries,) + row[5:] for row in rows]
+
+        try:
+            conn.executemany(INSERT_JOB_SQL, with_defaults([row for p in batch for row in p.rows]))
+            conn.commit()
+            return
+        except sqlite3.Error:
+            conn.rollback()
+        # Fall back to one transaction per request so one bad request
+        # does not fail the others in its batch
+        for p in batch:
+            try:
+                conn.executemany(INSERT_JOB_SQL, with_defaults(p.rows))
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                p.error = e
+
+    def run(self):
+        conn = get_conn()
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        while not (self.stop_event.is_set() and self.requests.empty()):
+            try:
+                first = self.requests.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = self._collect(first)
+            self._write(conn, batch)
+            for p in batch:
+                p.done.set()
+        conn.close()
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _dlq_filters(params):
+    """Pull the shared DLQ filters out of a request body or query string."""
+    since = params.get("since")
+    try:
+        return {
+            "since": normalize_since(str(since)) if since else None,
+            "error_match": params.get("error_match"),
+            "command_match": params.get("command_match"),
+        }
+    except ValueError as e:
+        raise ApiError(400, f"since: {e}")
+
+
+def is_loopback(host):
+    """True for localhost / loopback IPs, with or without a :port suffix."""
+    host = host.strip()
+    if host.startswith("["):
+        host = host[1:host.find("]")]
+    elif host.count(":") == 1:
+        host = host.split(":")[0]
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _bool_param(params, key):
+    value = params.get(key, False)
+    if not isinstance(value, bool):
+        raise ApiError(400, f"{key} must be true or false")
+    return value
+
+
+def _int_param(params, key, default=None, maximum=None):
+    value = params.get(key, default)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"{key} must be an integer")
+    if value < 1:
+        raise ApiError(400, f"{key} must be >= 1")
+    if maximum is not None and value > maximum:
+        raise ApiError(400, f"{key} must be <= {maximum}")
+    return value
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """JSON API. Routes:
+
+    POST /jobs          one job object or a list of them
+    GET  /jobs          ?state=&limit=
+    GET  /status
+    GET  /dlq           ?since=&error_match=&command_match=&limit=&after_updated_at=&after_id=
+    POST /dlq/retry     {"id": ...} or {"all": true, filters..., "rate": n}
+    POST /dlq/purge     {"all": true, filters...}
+
+    Workers run job commands through the shell, so the API must not be
+    reachable from a browser: POSTs must be application/json (which forces a
+    CORS preflight), and without a token only loopback Host/Origin values
+    are accepted. With a token every request needs `Authorization: Bearer`.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse one connection
+    server_version = "queuectl"
+    # Headers and body are written separately; without TCP_NODELAY every
+    # response on a keep-alive connection waits on the peer's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Per-request logging to stderr costs more than the enqueue itself
+        pass
+
+    def setup(self):
+        super().setup()
+        self._conn = None
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+
+    @property
+    def conn(self):
+        """SQLite connection reused for every request on this client connection."""
+        if self._conn is None:
+            self._conn = get_conn()
+        return self._conn
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _check_request(self):
+        token = self.server.token
+        if token:
+            auth = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+                raise ApiError(401, "missing or invalid token")
+        elif not is_loopback(self.headers.get("Host", "")):
+            raise ApiError(403, "Host must be a loopback address")
+        origin = self.headers.get("Origin")
+        if origin is not None and not is_loopback(urlparse(origin).netloc):
+            raise ApiError(403, "cross-origin requests are not allowed")
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "invalid Content-Length")
+        if length < 0:
+            raise ApiError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, f"request body larger than {MAX_BODY_BYTES} bytes")
+        data = self.rfile.read(length)
+        self.body_read = True
+        return data
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        route = ROUTES.get((method, url.path.rstrip("/") or "/"))
+        self.body_read = False
+        try:
+            # Consume any body before rejecting the request so the client is
+            # not cut off mid-send and the keep-alive connection stays usable
+            data = self._read_body() if method == "POST" else b""
+            self._check_request()
+            if route is None:
+                raise ApiError(404, f"no route for {method} {url.path}")
+            if method == "POST":
+                if self.headers.get_content_type() != "application/json":
+                    raise ApiError(415, "Content-Type must be application/json")
+                try:
+                    params = json.loads(data or b"{}")
+                except ValueError as e:
+                    raise ApiError(400, "Invalid JSON: " + str(e))
+                # Only enqueue accepts a list (batch); everything else takes an object
+                if not isinstance(params, dict) and not (isinstance(params, list) and route is ApiHandler.enqueue):
+                    raise ApiError(400, "Request body must be a JSON object")
+            else:
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            status, body = route(self, params)
+        except ApiError as e:
+            status, body = e.status, {"error": str(e)}
+            if method == "POST" and not self.body_read:
+                # The unread body would be parsed as the next request
+                self.close_connection = True
+        except sqlite3.Error as e:
+            if self._conn is not None:
+                self._conn.rollback()
+            status, body = 500, {"error": str(e)}
+        self._send(status, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def enqueue(self, params):
+        # No DB access here: the batcher's writer fills in default max_retries
+        jobs = params if isinstance(params, list) else [params]
+        try:
+            rows = [prepare_job(job) for job in jobs]
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if rows:
+            self.server.batcher.submit(rows)
+        return 201, {"enqueued": [row[0] for row in rows]}
+
+    def list_jobs(self, params):
+        conn = self.conn
+        state = params.get("state")
+        limit = _int_param(params, "limit", 100, maximum=MAX_LIMIT)
+        if state:
+            if state not in JOB_STATES:
+                raise ApiError(400, f"state must be one of {', '.join(JOB_STATES)}")
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state=? ORDER BY created_at DESC LIMIT ?", (state, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return 200, {"jobs": [dict(r) for r in rows]}
+
+    def status(self, params):
+        counts = state_counts(self.conn)
+        return 200, {"total": sum(counts.values()), "states": counts}
+
+    def dlq_list(self, params):
+        limit = _int_param(params, "limit", 100, maximum=MAX_LIMIT)
+        after = (params.get("after_updated_at", ""), params.get("after_id", ""))
+        jobs = list(itertools.islice(
+            iter_dead(self.conn, batch_size=limit, after=after, **_dlq_filters(params)), limit))
+        # Keyset cursor for the next page, None once the DLQ is exhausted
+        cursor = None
+        if len(jobs) == limit:
+            cursor = {"after_updated_at": jobs[-1]["updated_at"], "after_id": jobs[-1]["id"]}
+        return 200, {"jobs": jobs, "next": cursor}
+
+    def dlq_retry(self, params):
+        conn = self.conn
+        filters = _dlq_filters(params)
+        all_jobs = _bool_param(params, "all")
+        rate = _int_param(params, "rate")
+        if params.get("id") is not None:
+            if not isinstance(params["id"], str):
+                raise ApiError(400, "id must be a string")
+            if all_jobs or rate or any(filters.values()):
+                raise ApiError(400, "Pass either id or all / filters, not both")
+            if not requeue_job(conn, params["id"]):
+                raise ApiError(404, "Job not found in DLQ")
+            return 200, {"requeued": 1}
+        if not (all_jobs or any(filters.values())):
+            raise ApiError(400, "Specify id, all, or at least one filter")
+        count = requeue_dead(conn, rate=rate,
+                             batch_size=_int_param(params, "batch_size", DEFAULT_BATCH_SIZE), **filters)
+        return 200, {"requeued": count}
+
+    def dlq_purge(self, params):
+        conn = self.conn
+        filters = _dlq_filters(params)
+        if not (_bool_param(params, "all") or any(filters.values())):
+            raise ApiError(400, "Specify all or at least one filter")
+        count = purge_dead(conn, batch_size=_int_param(params, "batch_size", DEFAULT_BATCH_SIZE), **filters)
+        return 200, {"purged": count}
+
+
+ROUTES = {
+    ("POST", "/jobs"): ApiHandler.enqueue,
+    ("GET", "/jobs"): ApiHandler.list_jobs,
+    ("GET", "/status"): ApiHandler.status,
+    ("GET", "/dlq"): ApiHandler.dlq_list,
+    ("POST", "/dlq/retry"): ApiHandler.dlq_retry,
+    ("POST", "/dlq/purge"): ApiHandler.dlq_purge,
+}
+
+
+class UnixApiHandler(ApiHandler):
+    disable_nagle_algorithm = False  # TCP_NODELAY does not apply to Unix sockets
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, batcher=None, token=None):
+    """Create the API server on a TCP port or, if socket_path is given, a Unix socket.
+    Raises ValueError for a non-loopback host without a token, or a socket
+    path that exists and is not a socket."""
+    if socket_path:
+        if os.path.lexists(socket_path):
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise ValueError(f"{socket_path} exists and is not a socket")
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                # Nobody is listening: stale socket from a previous run
+                os.unlink(socket_path)
+            else:
+                raise ValueError(f"another server is already listening on {socket_path}")
+            finally:
+                probe.close()
+        server = UnixHTTPServer(socket_path, UnixApiHandler)
+    else:
+        if not is_loopback(host) and not token:
+            raise ValueError(f"refusing to listen on non-loopback address {host} without --token")
+        server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.batcher = batcher or EnqueueBatcher()
+    server.token = token
+    return server
+
+
+@click.command("serve")
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to listen on")
+@click.option("--port", default=DEFAULT_PORT, show_default=True, help="TCP port to listen on")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False), help="Listen on this Unix socket instead of TCP")
+@click.option("--batch-max", default=1000, show_default=True, type=click.IntRange(min=1), help="Max jobs per group commit")
+@click.option("--batch-wait-ms", default=0, show_default=True, type=click.IntRange(min=0), help="How long to gather enqueues into one commit")
+@click.option("--token", envvar="QUEUECTL_TOKEN", help="Require `Authorization: Bearer <token>` (needed for non-loopback --host)")
+def serve(host, port, socket_path, batch_max, batch_wait_ms, token):
+    """Run a long-lived JSON API for enqueue, status, list and DLQ operations
+
+    \b
+    Examples:
+      queuectl serve --port 8765
+      queuectl serve --socket /tmp/queuectl.sock
+      QUEUECTL_TOKEN=secret queuectl serve --host 0.0.0.0
+    """
+    batcher = EnqueueBatcher(max_batch=batch_max, max_wait=batch_wait_ms / 1000.0)
+    try:
+        server = make_server(host, port, socket_path, batcher, token)
+    except ValueError as e:
+        click.echo(str(e))
+        raise SystemExit(1)
+    batcher.start()
+    where = socket_path or f"http://{host}:{port}"
+    click.echo(f"Serving queuectl API on {where}. Press Ctrl-C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("Keyboard interrupt — shutting down")
+    finally:
+        server.server_close()
+        batcher.stop()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -3,3 +3,10 @@ import datetime
 
 def now_iso():
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+
+def future_iso(seconds, base=None):
+    """Return the UTC timestamp `seconds` after base (default: now), formatted like now_iso()."""
+    when = (base or datetime.datetime.utcnow()) + datetime.timedelta(seconds=seconds)
+    return when.replace(microsecond=0).isoformat() + "Z"
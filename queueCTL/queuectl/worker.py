@@ -1,39 +1,40 @@
 import threading
 import time
 import subprocess
-import datetime
 import click
 from .db import get_conn, get_config, set_config
-from .utils import now_iso
+from .utils import now_iso, future_iso
+from .retry import load_policy, compute_delay, should_retry, circuit_open_until, defer_until, record_outcome, command_class
 
 stop_event = threading.Event()
 
-def update_job_state(conn, job_id, state, last_error=None, next_run_at=None, expected_state=None):
+def update_job_state(conn, job_id, state, last_error=None, next_run_at=None, expected_state=None, last_delay=None):
     """Update job state and related fields.
-    If expected_state is provided, only update if current state matches (for safety)."""
+    If expected_state is provided, only update if current state matches (for safety).
+    last_delay records the retry delay when last_error is given."""
     cur = conn.cursor()
     now = now_iso()
     if last_error is not None and next_run_at is not None:
         if expected_state:
             cur.execute(
-                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=? WHERE id=? AND state=?",
-                (state, now, last_error, next_run_at, job_id, expected_state)
+                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=?, last_delay=? WHERE id=? AND state=?",
+                (state, now, last_error, next_run_at, last_delay, job_id, expected_state)
             )
         else:
             cur.execute(
-                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=? WHERE id=?",
-                (state, now, last_error, next_run_at, job_id)
+                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=?, last_delay=? WHERE id=?",
+                (state, now, last_error, next_run_at, last_delay, job_id)
             )
     elif last_error is not None:
         if expected_state:
             cur.execute(
-                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=? WHERE id=? AND state=?",
-                (state, now, last_error, next_run_at, job_id, expected_state)
+                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=?, last_delay=? WHERE id=? AND state=?",
+                (state, now, last_error, next_run_at, last_delay, job_id, expected_state)
             )
         else:
             cur.execute(
-                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=? WHERE id=?",
-                (state, now, last_error, next_run_at, job_id)
+                "UPDATE jobs SET state=?, attempts=attempts+1, updated_at=?, last_error=?, next_run_at=?, last_delay=? WHERE id=?",
+                (state, now, last_error, next_run_at, last_delay, job_id)
             )
     else:
         if expected_state:
@@ -59,7 +60,7 @@ def pick_job_and_lock(conn):
     try:
         # First, find a candidate job
         cur.execute("""
-            SELECT id, command, attempts, max_retries 
+            SELECT *
             FROM jobs 
             WHERE state='pending' 
             AND (next_run_at IS NULL OR next_run_at <= ?)
@@ -94,7 +95,40 @@ def pick_job_and_lock(conn):
         conn.rollback()
         raise
 
-def worker_loop(worker_id, backoff_base):
+def defer_job(conn, job_id, next_run_at):
+    """Put a picked job back to pending without counting an attempt."""
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE jobs SET state='pending', updated_at=?, next_run_at=? WHERE id=? AND state='processing'",
+        (now_iso(), next_run_at, job_id),
+    )
+    conn.commit()
+
+def defer_if_circuit_open(conn, worker_id, job):
+    """Put the job back if its command class has an open circuit. Returns True if deferred."""
+    open_until = circuit_open_until(conn, job['command'])
+    if not open_until:
+        return False
+    run_at = defer_until(conn, open_until)
+    click.echo(f"[worker {worker_id}] circuit open for '{command_class(job['command'])}', deferring job {job['id']} until {run_at}")
+    defer_job(conn, job['id'], run_at)
+    return True
+
+def fail_job(conn, worker_id, job, error_msg, exit_code=None):
+    """Schedule a retry according to the job's retry policy, or move it to the DLQ."""
+    job_id = job['id']
+    policy = load_policy(conn, job.get('retry_policy'))
+    record_outcome(conn, job['command'], success=False)
+    if should_retry(policy, job['attempts'], job['max_retries'], exit_code):
+        delay = compute_delay(policy, job['attempts'], prev_delay=job.get('last_delay'))
+        # last_delay feeds the next decorrelated jitter draw
+        update_job_state(conn, job_id, "pending", last_error=error_msg[:500], next_run_at=future_iso(delay),
+                         expected_state="processing", last_delay=delay)
+    else:
+        update_job_state(conn, job_id, "dead", last_error=error_msg[:500], next_run_at=None, expected_state="processing")
+        click.echo(f"[worker {worker_id}] job {job_id} moved to DLQ (dead)")
+
+def worker_loop(worker_id):
     """Main worker loop that processes jobs"""
     click.echo(f"[worker {worker_id}] started")
     while not stop_event.is_set():
@@ -113,11 +147,15 @@ def worker_loop(worker_id, backoff_base):
         
         job_id = job['id']
         command = job['command']
-        attempts = job['attempts']
-        max_retries = job['max_retries']
+        
+        if defer_if_circuit_open(conn, worker_id, job):
+            conn.close()
+            continue
         
         click.echo(f"[worker {worker_id}] processing job {job_id}: {command}")
         
+        error_msg = None
+        exit_code = None
         try:
             # Execute the command
             result = subprocess.run(
@@ -132,33 +170,22 @@ def worker_loop(worker_id, backoff_base):
                 # Success
                 click.echo(f"[worker {worker_id}] job {job_id} completed successfully")
                 update_job_state(conn, job_id, "completed", expected_state="processing")
+                record_outcome(conn, command, success=True)
             else:
                 # Failed
                 error_msg = result.stderr or result.stdout or "Command failed"
+                exit_code = result.returncode
                 click.echo(f"[worker {worker_id}] job {job_id} failed: {error_msg[:100]}")
-                if attempts < max_retries:
-                    delay = (backoff_base ** attempts)
-                    next_run = (datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)).replace(microsecond=0).isoformat() + "Z"
-                    update_job_state(conn, job_id, "pending", last_error=error_msg[:500], next_run_at=next_run, expected_state="processing")
-                else:
-                    update_job_state(conn, job_id, "dead", last_error=error_msg[:500], next_run_at=None, expected_state="processing")
-                    click.echo(f"[worker {worker_id}] job {job_id} moved to DLQ (dead)")
         except subprocess.TimeoutExpired:
             click.echo(f"[worker {worker_id}] job {job_id} timed out.")
-            if attempts < max_retries:
-                delay = (backoff_base ** attempts)
-                next_run = (datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)).replace(microsecond=0).isoformat() + "Z"
-                update_job_state(conn, job_id, "pending", last_error="timeout", next_run_at=next_run, expected_state="processing")
-            else:
-                update_job_state(conn, job_id, "dead", last_error="timeout", next_run_at=None, expected_state="processing")
+            error_msg = "timeout"
         except Exception as e:
             click.echo(f"[worker {worker_id}] unexpected error for job {job_id}: {e}")
-            if attempts < max_retries:
-                delay = (backoff_base ** attempts)
-                next_run = (datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)).replace(microsecond=0).isoformat() + "Z"
-                update_job_state(conn, job_id, "pending", last_error=str(e), next_run_at=next_run, expected_state="processing")
-            else:
-                update_job_state(conn, job_id, "dead", last_error=str(e), next_run_at=None, expected_state="processing")
+            error_msg = str(e)
+        
+        # Outside the try so a failure here is not handled as a second job failure
+        if error_msg is not None:
+            fail_job(conn, worker_id, job, error_msg, exit_code=exit_code)
         
         conn.close()
     
@@ -175,12 +202,11 @@ def worker():
 @click.option("--count", default=1, help="Number of worker threads to start")
 def start(count):
     conn = get_conn()
-    backoff_base = int(get_config(conn, "backoff_base", "2"))
     set_config(conn, "stop_workers", "false")
     stop_event.clear()
     threads = []
     for i in range(count):
-        t = threading.Thread(target=worker_loop, args=(i + 1, backoff_base), daemon=True)
+        t = threading.Thread(target=worker_loop, args=(i + 1,), daemon=True)
         threads.append(t)
         t.start()
     click.echo(f"Started {count} worker(s). Press Ctrl-C to stop.")
@@ -1,4 +1,5 @@
 import os
+import json
 import sqlite3
 from click.testing import CliRunner
 import pytest
@@ -42,3 +43,80 @@ def test_dlq_retry(tmp_path, monkeypatch):
     assert row[0] == 'pending'
     assert row[1] == 0
     conn.close()
+
+
+def add_dead_jobs(db_path, jobs):
+    conn = sqlite3.connect(str(db_path))
+    conn.executemany("INSERT INTO jobs(id,command,state,attempts,max_retries,created_at,updated_at,last_error) VALUES (?,?,'dead',3,3,?,?,?)",
+                     [(j, cmd, ts, ts, err) for j, cmd, ts, err in jobs])
+    conn.commit()
+    conn.close()
+
+def test_dlq_bulk_retry_filters_and_rate(tmp_path, monkeypatch):
+    db_path = setup_db_with_dead(tmp_path, monkeypatch)
+    add_dead_jobs(db_path, [
+        ('dead%d' % i, 'curl http://svc', '2025-11-05T09:00:00Z', 'connection refused') for i in range(2, 7)
+    ] + [('old1', 'curl http://svc', '2025-11-01T00:00:00Z', 'connection refused')])
+    from queuectl.cli import cli
+    runner = CliRunner()
+    # a job id cannot be combined with bulk options
+    res = runner.invoke(cli, ['dlq', 'retry', 'dead1', '--all'])
+    assert res.exit_code == 1
+    res = runner.invoke(cli, ['dlq', 'retry', '--since', '2025-11-05', '--error-match', 'refused',
+                              '--rate', '2', '--batch-size', '10'])
+    assert res.exit_code == 0, res.output
+    assert 'Requeued 5 job(s)' in res.output
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute("SELECT id, state, next_run_at FROM jobs ORDER BY id").fetchall()
+    states = {r[0]: r[1] for r in rows}
+    assert states['dead1'] == 'dead' and states['old1'] == 'dead'
+    run_ats = sorted(r[2] for r in rows if r[1] == 'pending')
+    # 5 jobs at 2/sec are spread over 3 distinct seconds
+    assert len(set(run_ats)) == 3
+    conn.close()
+
+def test_dlq_purge_and_export(tmp_path, monkeypatch):
+    db_path = setup_db_with_dead(tmp_path, monkeypatch)
+    add_dead_jobs(db_path, [('dead%d' % i, 'make build', '2025-11-05T09:00:%02dZ' % i, 'exit 2') for i in range(2, 9)])
+    from queuectl.cli import cli
+    runner = CliRunner()
+    out = tmp_path / "dlq.jsonl"
+    res = runner.invoke(cli, ['dlq', 'export', '--command-match', 'make', '--batch-size', '3', '-o', str(out)])
+    assert res.exit_code == 0, res.output
+    lines = out.read_text().splitlines()
+    assert [json.loads(l)['id'] for l in lines] == ['dead%d' % i for i in range(2, 9)]
+    res = runner.invoke(cli, ['dlq', 'purge', '--command-match', 'make', '--batch-size', '3', '--yes'])
+    assert res.exit_code == 0, res.output
+    assert 'Purged 7 job(s)' in res.output
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute("SELECT id FROM jobs").fetchall() == [('dead1',)]
+    conn.close()
+
+def test_dlq_retry_rate_not_multiple_of_batch_size(tmp_path, monkeypatch):
+    db_path = setup_db_with_dead(tmp_path, monkeypatch)
+    add_dead_jobs(db_path, [('dead%d' % i, 'true', '2025-11-05T09:00:00Z', 'x') for i in range(2, 13)])
+    from queuectl.cli import cli
+    res = CliRunner().invoke(cli, ['dlq', 'retry', '--all', '--rate', '3', '--batch-size', '2'])
+    assert res.exit_code == 0, res.output
+    assert 'Requeued 12 job(s)' in res.output
+    conn = sqlite3.connect(str(db_path))
+    per_second = [r[0] for r in conn.execute(
+        "SELECT COUNT(*) FROM jobs WHERE state='pending' GROUP BY next_run_at ORDER BY next_run_at")]
+    assert per_second == [3, 3, 3, 3]
+    conn.close()
+
+def test_requeue_dead_rate_keeps_full_chunks(tmp_path, monkeypatch):
+    db_path = setup_db_with_dead(tmp_path, monkeypatch)
+    add_dead_jobs(db_path, [('dead%d' % i, 'true', '2025-11-05T09:00:00Z', 'x') for i in range(2, 21)])
+    from queuectl.dlq import requeue_dead
+    from queuectl.db import get_conn
+    conn = get_conn()
+    updates = []
+    conn.set_trace_callback(lambda sql: updates.append(sql) if sql.lstrip().startswith('UPDATE') else None)
+    assert requeue_dead(conn, rate=1, batch_size=500) == 20
+    # one set-based UPDATE for the whole batch, not one per second of quota
+    assert len(updates) == 1
+    per_second = [r[0] for r in conn.execute(
+        "SELECT COUNT(*) FROM jobs WHERE state='pending' GROUP BY next_run_at ORDER BY next_run_at")]
+    assert per_second == [1] * 20
+    conn.close()
@@ -0,0 +1,104 @@
+import json
+import random
+import sqlite3
+from click.testing import CliRunner
+
+def test_compute_delay_jitter_and_cap():
+    from queuectl.retry import compute_delay, should_retry
+    rng = random.Random(7)
+    policy = {'backoff_base': 2, 'backoff_max': 10, 'jitter': 'none', 'retry_on': []}
+    assert [compute_delay(policy, a) for a in range(5)] == [1, 2, 4, 8, 10]
+    for mode in ('full', 'decorrelated'):
+        policy['jitter'] = mode
+        delays = [compute_delay(policy, 6, rng) for _ in range(50)]
+        assert all(0 <= d <= 10 for d in delays)
+        assert len(set(delays)) > 1
+    policy['retry_on'] = [75]
+    assert should_retry(policy, 0, 3, exit_code=75)
+    assert not should_retry(policy, 0, 3, exit_code=1)
+    assert should_retry(policy, 0, 3, exit_code=None)
+    assert not should_retry(policy, 3, 3, exit_code=75)
+
+def test_worker_failure_uses_job_policy_and_circuit(tmp_path, monkeypatch):
+    db_path = tmp_path / "queuectl.db"
+    monkeypatch.setenv('QUEUECTL_DB', str(db_path))
+    from queuectl.cli import cli
+    from queuectl.db import get_conn
+    from queuectl.worker import pick_job_and_lock, fail_job
+    from queuectl.retry import circuit_open_until
+    runner = CliRunner()
+    res = runner.invoke(cli, ['enqueue', json.dumps({'id': 'j1', 'command': 'curl http://svc', 'retry_on': [75]})])
+    assert res.exit_code == 0, res.output
+    res = runner.invoke(cli, ['enqueue', '{"id":"j2","command":"curl http://svc","jitter":"bogus"}'])
+    assert res.exit_code == 1
+    # config changes are picked up by later CLI calls and running workers alike
+    assert runner.invoke(cli, ['config', 'set', 'circuit_threshold', '1']).exit_code == 0
+    assert runner.invoke(cli, ['config', 'list']).output.count('circuit_threshold = 1') == 1
+    conn = get_conn()
+    job = pick_job_and_lock(conn)
+    assert json.loads(job['retry_policy']) == {'retry_on': [75]}
+    # exit code 1 is not in retry_on, so the job goes straight to the DLQ
+    fail_job(conn, 1, job, 'boom', exit_code=1)
+    row = conn.execute("SELECT state, attempts FROM jobs WHERE id='j1'").fetchone()
+    assert tuple(row) == ('dead', 1)
+    assert circuit_open_until(conn, 'curl http://other') is not None
+    assert circuit_open_until(conn, 'wget http://svc') is None
+    conn.close()
+
+def test_decorrelated_jitter_uses_previous_delay():
+    from queuectl.retry import compute_delay
+    rng = random.Random(3)
+    policy = {'backoff_base': 2, 'backoff_max': 0, 'jitter': 'decorrelated', 'retry_on': []}
+    assert all(2 <= compute_delay(policy, 0, rng) <= 6 for _ in range(50))
+    assert all(2 <= compute_delay(policy, 3, rng, prev_delay=40) <= 120 for _ in range(50))
+    assert max(compute_delay(policy, 3, rng, prev_delay=40) for _ in range(50)) > 6
+    policy['backoff_base'] = 0
+    assert compute_delay(policy, 2, rng, prev_delay=0) == 0
+
+def test_open_circuit_defers_jobs_with_jitter(tmp_path, monkeypatch):
+    db_path = tmp_path / "queuectl.db"
+    monkeypatch.setenv('QUEUECTL_DB', str(db_path))
+    from queuectl.cli import cli
+    from queuectl.db import get_conn
+    from queuectl.worker import pick_job_and_lock, fail_job, defer_if_circuit_open
+    from queuectl.retry import circuit_open_until
+    runner = CliRunner()
+    for i in range(6):
+        assert runner.invoke(cli, ['enqueue', json.dumps({'id': 'c%d' % i, 'command': 'curl http://svc'})]).exit_code == 0
+    runner.invoke(cli, ['config', 'set', 'circuit_threshold', '1'])
+    runner.invoke(cli, ['config', 'set', 'circuit_cooldown', '600'])
+    conn = get_conn()
+    fail_job(conn, 1, pick_job_and_lock(conn), 'refused', exit_code=7)
+    open_until = circuit_open_until(conn, 'curl')
+    assert open_until is not None
+    for _ in range(5):
+        assert defer_if_circuit_open(conn, 1, pick_job_and_lock(conn))
+    rows = conn.execute("SELECT state, attempts, next_run_at FROM jobs WHERE id != 'c0'").fetchall()
+    assert all(r['state'] == 'pending' and r['attempts'] == 0 for r in rows)
+    run_ats = [r['next_run_at'] for r in rows]
+    assert all(open_until <= t for t in run_ats)
+    assert len(set(run_ats)) > 1
+    conn.close()
+
+def test_delay_has_hard_ceiling_and_zero_base(tmp_path, monkeypatch):
+    from queuectl.retry import compute_delay, MAX_DELAY_SECONDS
+    rng = random.Random(5)
+    for mode in ('none', 'full', 'decorrelated'):
+        policy = {'backoff_base': 0, 'backoff_max': 0, 'jitter': mode, 'retry_on': []}
+        assert compute_delay(policy, 0, rng) == 0
+        policy['backoff_base'] = 2
+        assert compute_delay(policy, 200, rng, prev_delay=MAX_DELAY_SECONDS) <= MAX_DELAY_SECONDS
+    # a worker failing a job with uncapped backoff schedules it instead of crashing
+    monkeypatch.setenv('QUEUECTL_DB', str(tmp_path / "queuectl.db"))
+    from queuectl.cli import cli
+    from queuectl.db import get_conn
+    from queuectl.worker import pick_job_and_lock, fail_job
+    runner = CliRunner()
+    runner.invoke(cli, ['enqueue', '{"id":"big","command":"false","max_retries":500,"backoff_max":0}'])
+    conn = get_conn()
+    conn.execute("UPDATE jobs SET attempts=100")
+    conn.commit()
+    fail_job(conn, 1, pick_job_and_lock(conn), 'boom', exit_code=1)
+    row = conn.execute("SELECT state, attempts, last_delay FROM jobs").fetchone()
+    assert tuple(row) == ('pending', 101, MAX_DELAY_SECONDS)
+    conn.close()
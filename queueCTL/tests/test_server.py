@@ -0,0 +1,191 @@
+import sqlite3
+import threading
+import pytest
+from click.testing import CliRunner
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    db_path = tmp_path / "queuectl.db"
+    monkeypatch.setenv('QUEUECTL_DB', str(db_path))
+    from queuectl.db import init_db
+    from queuectl.server import make_server
+    init_db()
+    server = make_server(socket_path=str(tmp_path / "q.sock"))
+    server.batcher.start()
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    yield db_path, str(tmp_path / "q.sock")
+    server.shutdown()
+    server.server_close()
+    server.batcher.stop()
+
+def test_server_enqueue_status_and_dlq(api):
+    db_path, sock = api
+    from queuectl.client import QueueClient, QueueClientError
+    with QueueClient(socket_path=sock) as client:
+        assert client.enqueue("echo hi", id="a1", max_retries=5) == "a1"
+        ids = client.enqueue_batch([{"command": "echo %d" % i} for i in range(20)])
+        assert len(ids) == 20
+        with pytest.raises(QueueClientError) as exc:
+            client.enqueue_batch([{"command": "ok"}, {"id": "no_command"}])
+        assert exc.value.status == 400
+        status = client.status()
+        assert status["total"] == 21 and status["states"]["pending"] == 21
+        assert [j["id"] for j in client.list_jobs(state="pending", limit=500) if j["id"] == "a1"] == ["a1"]
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("UPDATE jobs SET state='dead', last_error='refused' WHERE id IN ('a1', ?)", (ids[0],))
+        conn.commit()
+        conn.close()
+        assert len(client.dlq_list(error_match="refused")) == 2
+        assert client.dlq_retry("a1") == 1
+        with pytest.raises(QueueClientError):
+            client.dlq_retry()
+        assert client.dlq_purge(all=True) == 1
+        assert client.status()["states"]["dead"] == 0
+
+def test_server_group_commits_concurrent_enqueues(api):
+    db_path, sock = api
+    from queuectl.client import QueueClient
+
+    def produce(n):
+        with QueueClient(socket_path=sock) as client:
+            for i in range(25):
+                client.enqueue("echo %d" % i, id="p%d_%d" % (n, i))
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 200
+    conn.close()
+
+def raw_request(sock, method, path, body=b"", headers=None):
+    from queuectl.client import _UnixHTTPConnection
+    conn = _UnixHTTPConnection(sock, 5)
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    status, data = resp.status, resp.read()
+    conn.close()
+    return status, data
+
+def test_server_rejects_browser_style_requests(api):
+    db_path, sock = api
+    job = b'{"command": "touch /tmp/pwned"}'
+    assert raw_request(sock, "POST", "/jobs", job, {"Content-Type": "text/plain"})[0] == 415
+    assert raw_request(sock, "POST", "/jobs", job, {"Content-Type": "application/json", "Host": "evil.example"})[0] == 403
+    assert raw_request(sock, "POST", "/jobs", job, {"Content-Type": "application/json",
+                                                    "Origin": "http://evil.example"})[0] == 403
+    assert raw_request(sock, "POST", "/jobs", b"", {"Content-Type": "application/json",
+                                                    "Content-Length": "abc"})[0] == 400
+    assert raw_request(sock, "POST", "/jobs", b"", {"Content-Type": "application/json",
+                                                    "Content-Length": "-5"})[0] == 400
+    assert raw_request(sock, "POST", "/jobs", b"", {"Content-Type": "application/json",
+                                                    "Content-Length": str(1 << 30)})[0] == 413
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    conn.close()
+
+def test_server_token_and_bind_checks(tmp_path, monkeypatch):
+    monkeypatch.setenv('QUEUECTL_DB', str(tmp_path / "queuectl.db"))
+    from queuectl.db import init_db
+    from queuectl.server import make_server
+    from queuectl.client import QueueClient, QueueClientError
+    init_db()
+    with pytest.raises(ValueError):
+        make_server(host="0.0.0.0", port=0)
+    not_a_socket = tmp_path / "precious.txt"
+    not_a_socket.write_text("keep me")
+    with pytest.raises(ValueError):
+        make_server(socket_path=str(not_a_socket))
+    assert not_a_socket.read_text() == "keep me"
+    server = make_server(host="127.0.0.1", port=0, token="s3cret")
+    server.batcher.start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d" % server.server_address[1]
+    try:
+        with pytest.raises(QueueClientError) as exc:
+            QueueClient(url).status()
+        assert exc.value.status == 401
+        with QueueClient(url, token="s3cret") as client:
+            assert client.enqueue("echo hi", id="t1") == "t1"
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.batcher.stop()
+
+def test_server_dlq_paging_and_retry_validation(api):
+    db_path, sock = api
+    from queuectl.client import QueueClient, QueueClientError
+    with QueueClient(socket_path=sock) as client:
+        client.enqueue_batch([{"id": "d%02d" % i, "command": "false"} for i in range(7)])
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("UPDATE jobs SET state='dead'")
+        conn.commit()
+        conn.close()
+        page = client.dlq_list(limit=3)
+        assert len(page) == 3
+        rest = client.dlq_list(limit=10, after_updated_at=page[-1]["updated_at"], after_id=page[-1]["id"])
+        assert len(rest) == 4
+        assert sorted(j["id"] for j in list(client.iter_dlq(page_size=2))) == ["d%02d" % i for i in range(7)]
+        status, data = raw_request(sock, "POST", "/dlq/retry", b'{"id": "d00", "all": true}',
+                                   {"Content-Type": "application/json"})
+        assert status == 400
+        status, data = raw_request(sock, "POST", "/dlq/retry", b'{"all": "false"}',
+                                   {"Content-Type": "application/json"})
+        assert status == 400
+        with pytest.raises(QueueClientError):
+            client.dlq_retry("d00", error_match="x")
+        assert client.status()["states"]["dead"] == 7
+
+def test_server_rejects_bad_types_and_limits(api):
+    db_path, sock = api
+    from queuectl.client import QueueClient, QueueClientError
+    with QueueClient(socket_path=sock) as client:
+        for bad in ({"command": ["ls"]}, {"id": {"x": 1}, "command": "ls"}):
+            with pytest.raises(QueueClientError) as exc:
+                client.enqueue_batch([{"command": "echo ok"}, bad])
+            assert exc.value.status == 400
+        with pytest.raises(QueueClientError) as exc:
+            client.dlq_retry({"x": 1})
+        assert exc.value.status == 400
+        for limit in (1001, 10 ** 9):
+            with pytest.raises(QueueClientError) as exc:
+                client.dlq_list(limit=limit)
+            assert exc.value.status == 400
+            with pytest.raises(QueueClientError):
+                client.list_jobs(limit=limit)
+        assert client.status()["total"] == 0
+    from queuectl.cli import cli
+    res = CliRunner().invoke(cli, ['enqueue', '{"command": ["ls"]}'])
+    assert res.exit_code == 1 and "must be a string" in res.output
+
+def test_server_reuses_connection_and_default_max_retries(api, monkeypatch):
+    db_path, sock = api
+    import queuectl.server
+    from queuectl.client import QueueClient
+    from queuectl.db import get_conn, set_config
+    conn = get_conn()
+    set_config(conn, "max_retries", "7")
+    conn.close()
+    opened = []
+    monkeypatch.setattr(queuectl.server, "get_conn", lambda: opened.append(1) or get_conn())
+    with QueueClient(socket_path=sock) as client:
+        for i in range(10):
+            client.enqueue("echo %d" % i, id="r%d" % i)
+            client.status()
+    # one connection for the keep-alive client; the writer thread already had its own
+    assert len(opened) == 1
+    conn = sqlite3.connect(str(db_path))
+    assert conn.execute("SELECT DISTINCT max_retries FROM jobs").fetchall() == [(7,)]
+    conn.close()
+
+def test_server_refuses_live_socket(api, tmp_path):
+    db_path, sock = api
+    from queuectl.server import make_server
+    with pytest.raises(ValueError):
+        make_server(socket_path=sock)
+    from queuectl.client import QueueClient
+    with QueueClient(socket_path=sock) as client:
+        assert client.status()["total"] == 0